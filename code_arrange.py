@@ -1,24 +1,39 @@
 import os
-from pathlib import Path
+import shutil
+
+SEPARATOR = b'-' * 75 + b'\n'
+
+
+def _walk(dir_path):
+    # os.scandir reuses the stat info from the directory listing, so each entry is visited once.
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(entry.path)
+            # Symlinked files are included (like Path.is_file()); symlinked dirs are not descended.
+            elif entry.is_file() and '.' in entry.name:
+                yield entry
 
 def gather_files_content(root_dir, output_file):
-    root_path = Path(root_dir)
-    with open(output_file, 'w', encoding='utf-8') as out_f:
-        for file_path in root_path.rglob('*.*'):
-            if file_path.is_file() and file_path != Path(output_file):
-                try:
-                    out_f.write('-' * 75 + '\n')
-                    out_f.write(f'{file_path.relative_to(root_path)}\n')
-                    out_f.write('-' * 75 + '\n')
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as in_f:
-                        out_f.write(in_f.read())
-                    out_f.write('\n')
-                    
-                except Exception as e:
-                    print(f"Error processing {file_path}: {str(e)}")
+    output_path = os.path.abspath(output_file)
+    # Binary mode + copyfileobj streams file contents in 1 MiB chunks without decoding.
+    with open(output_file, 'wb') as out_f:
+        for entry in _walk(root_dir):
+            if os.path.abspath(entry.path) == output_path:
+                continue
+            try:
+                out_f.write(SEPARATOR)
+                out_f.write(os.path.relpath(entry.path, root_dir).encode('utf-8', errors='ignore') + b'\n')
+                out_f.write(SEPARATOR)
+                with open(entry.path, 'rb') as in_f:
+                    shutil.copyfileobj(in_f, out_f, length=1 << 20)
+                out_f.write(b'\n')
+
+            except Exception as e:
+                print(f"Error processing {entry.path}: {str(e)}")
     print(f"All files written to {output_file}")
 
 if __name__ == '__main__':
     directory = input("Enter directory to scan (or '.' for current): ") or '.'
     output_filename = 'all_files_content.txt'
-    gather_files_content(directory, output_filename)
\ No newline at end of file
+    gather_files_content(directory, output_filename)
@@ -1,11 +1,15 @@
 import os
+import sys
 import time
 import random
+import asyncio
 import datetime
-import requests
+import httpx
+import simdjson
 import bittensor as bt
 
-from typing import List, Tuple
+from cachetools import TTLCache
+from typing import Dict, List, Optional, Tuple
 from template.base.miner import BaseMinerNeuron
 from template.protocol import (
     FlightSearchBatchRequest,
@@ -14,6 +18,28 @@ from template.protocol import (
     FlightSearchResponse
 )
 
+
+def _at(node, pointer: str, default):
+    """
+    Resolve a JSON pointer on a simdjson document/element, returning `default`
+    if the path is missing or has an unexpected type.
+    """
+    try:
+        return node.at_pointer(pointer)
+    except (KeyError, IndexError, TypeError, ValueError):
+        return default
+
+
+def _typed(value, types, name: str):
+    """
+    Return `value` if it is one of `types`, else raise ValueError. Used to
+    check API values by hand, since model_construct skips pydantic validation.
+    """
+    if isinstance(value, bool) or not isinstance(value, types):
+        raise ValueError(f"unexpected {name}: {type(value).__name__}")
+    return value
+
+
 class Miner(BaseMinerNeuron):
     """
     Miner that calls the Skyscanner API for each incoming flight-search request,
@@ -24,8 +50,10 @@ class Miner(BaseMinerNeuron):
        export SKYSCANNER_API_KEY="your_rapid_api_key"
     2. Or store the key in your config and read it in __init__ below.
 
-    This example uses requests.get() in a blocking manner. For
-    a fully async approach, consider using an async library such as aiohttp.
+    All queries of a batch are sent concurrently over a shared HTTP/2 httpx client,
+    bounded by `config.skyscanner_concurrency` (default 16) in-flight requests.
+    Parsed results are cached per route/date/market for
+    `config.skyscanner_cache_ttl` seconds (default 300).
     """
 
     def __init__(self, config=None):
@@ -44,11 +72,41 @@ class Miner(BaseMinerNeuron):
         # For example, if the user also wants to store x-rapidapi-host:
         self.rapidapi_host = "skyscanner89.p.rapidapi.com"
 
+        # Request pieces that are identical for every query, built once.
+        self._url = f"https://{self.rapidapi_host}/flights/one-way/list"
+        self._headers = {
+            "x-rapidapi-key": self.skyscanner_api_key,
+            "x-rapidapi-host": self.rapidapi_host
+        }
+
+        # Shared HTTP/2 client, created lazily inside the axon's event loop.
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+
+        # One simdjson parser (and its internal padded buffer) reused for every
+        # response instead of allocating a fresh parser per request.
+        self._json_parser = simdjson.Parser(max_capacity=4 * 1024 * 1024)
+
+        # Parsed flights per distinct query (see _fetch_cached), so repeated
+        # routes skip both the paid API call and the parse.
+        self._cache = TTLCache(
+            maxsize=self.config.get("skyscanner_cache_size", 4096),
+            ttl=self.config.get("skyscanner_cache_ttl", 300),
+        )
+        # One lock per in-flight key so identical concurrent queries fetch once.
+        self._key_locks: Dict[tuple, asyncio.Lock] = {}
+
+        # hotkey -> uid lookup for blacklist/priority, rebuilt on every metagraph resync.
+        self._hotkey_to_uid: Dict[str, int] = {}
+        self._refresh_hotkey_index()
+
     async def forward(self, synapse: FlightSearchBatchRequest) -> FlightSearchBatchResponse:
         """
         Main method. We expect a FlightSearchBatchRequest from the validator,
         containing multiple FlightSearchRequest objects in `synapse.queries`.
-        We call the Skyscanner API for each request and build the FlightSearchBatchResponse.
+        We call the Skyscanner API for all requests concurrently and build the
+        FlightSearchBatchResponse.
 
         Args:
             synapse: FlightSearchBatchRequest with .queries list
@@ -56,88 +114,170 @@ class Miner(BaseMinerNeuron):
         Returns:
             FlightSearchBatchResponse with an array of responses for each query
         """
+        if not self.skyscanner_api_key:
+            # No valid API key, use a mock flight for every query
+            return FlightSearchBatchResponse(
+                responses=[[self._mock_flight(req)] for req in synapse.queries]
+            )
+
+        # Fan out all queries at once; the semaphore bounds in-flight requests.
+        results = await asyncio.gather(
+            *[self._fetch_cached(req) for req in synapse.queries],
+            return_exceptions=True,
+        )
+
         all_responses: List[List[FlightSearchResponse]] = []
-        
-        # For each query in the batch, call the Skyscanner API or mock if no API key
-        for req in synapse.queries:
+        for req, result in zip(synapse.queries, results):
+            if isinstance(result, Exception):
+                bt.logging.warning(f"Skyscanner request failed: {result}")
+                # fallback to mock
+                result = [self._mock_flight(req)]
+            elif not result:
+                # If no flights, can fallback:
+                result = [self._mock_flight(req)]
+            all_responses.append(result)
+
+        return FlightSearchBatchResponse(responses=all_responses)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Lazily create the shared HTTP client (and the semaphore bounding it)
+        inside the axon's event loop. With HTTP/2 the queries of a batch are
+        multiplexed as streams over one connection to the RapidAPI host.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client_loop = asyncio.get_running_loop()
+            self._client = httpx.AsyncClient(
+                http2=True,
+                headers=self._headers,
+                timeout=10.0,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60),
+            )
+            self._sem = asyncio.Semaphore(self.config.get("skyscanner_concurrency", 16))
+        return self._client
+
+    async def _fetch_cached(self, req: FlightSearchRequest) -> List[FlightSearchResponse]:
+        """
+        Serve a request from the TTL cache, or fetch it while concurrent
+        identical requests wait for that single result instead of calling
+        the API themselves. Failed or empty results are not cached.
+        """
+        # Every parameter sent to RapidAPI, plus what shapes the built responses.
+        key = (
+            req.origin, req.originId, req.destination, req.destinationId,
+            req.date, req.market, req.currency, req.limit,
+        )
+        flights = self._cache.get(key)
+        if flights is not None:
+            return flights
+
+        lock = self._key_locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                flights = self._cache.get(key)
+                if flights is None:
+                    flights = await self._fetch(req)
+                    if flights:
+                        self._cache[key] = flights
+        finally:
+            if self._key_locks.get(key) is lock:
+                del self._key_locks[key]
+        return flights
+
+    async def _fetch(self, req: FlightSearchRequest) -> List[FlightSearchResponse]:
+        """
+        Call the Skyscanner API for a single request and convert the result
+        into a list of FlightSearchResponse objects (possibly empty).
+        """
+        client = self._get_client()
+
+        # The user might want to adapt date, cabin, etc. for these parameters
+        # For demonstration, we only pass a few mandatory fields
+        query_params = {
+            "origin": req.origin,               # e.g. "NYCA"
+            "originId": req.originId,           # e.g. "27537542"
+            "destination": req.destination,     # e.g. "HNL"
+            "destinationId": req.destinationId, # e.g. "95673827"
+            "date": req.date,                 # e.g. "2023-10-01"
+            "market": req.market,               # e.g. "US"
+            # Potentially add "date" or "departDate" if Skyscanner requires it
+        }
+
+        # Perform the GET request; headers and timeout come from the client
+        async with self._sem:
+            r = await client.get(self._url, params=query_params)
+        r.raise_for_status()
+        raw = r.content
+
+        # The parsed document is only valid until the parser's next parse() call,
+        # so it must be fully converted below without yielding to the event loop.
+        data = self._json_parser.parse(raw)
+        flight_json_list = flight_item = None
+        try:
+            # Now parse `data` from Skyscanner’s response structure
+            # to fill a FlightSearchResponse object. The actual JSON shape
+            # will differ, so adapt to the real structure.
             flights_for_this_query: List[FlightSearchResponse] = []
 
-            if self.skyscanner_api_key:
-                # Build the request
-                url = "https://skyscanner89.p.rapidapi.com/flights/one-way/list"
-                
-                # The user might want to adapt date, cabin, etc. for these parameters
-                # For demonstration, we only pass a few mandatory fields
-                query_params = {
-                    "origin": req.origin,               # e.g. "NYCA"
-                    "originId": req.originId,           # e.g. "27537542"
-                    "destination": req.destination,     # e.g. "HNL"
-                    "destinationId": req.destinationId, # e.g. "95673827"
-                    "date": req.date,                 # e.g. "2023-10-01"
-                    "market": req.market,               # e.g. "US"
-                    # Potentially add "date" or "departDate" if Skyscanner requires it
-                }
-                headers = {
-                    "x-rapidapi-key": self.skyscanner_api_key,
-                    "x-rapidapi-host": self.rapidapi_host
-                }
-
-                # Perform the GET request
+            # Example pseudo-parse: direct JSON pointer lookups on the simdjson
+            # document instead of nested dict.get() chains.
+            flight_json_list = _at(data, "/result/flights", None)
+            if not isinstance(flight_json_list, simdjson.Array) or not flight_json_list:
+                # If no flights found, we might fallback
+                bt.logging.debug("No flights returned by Skyscanner for query, returning empty list.")
+                return flights_for_this_query
+
+            # Convert each flight JSON to a FlightSearchResponse
+            # This is a highly simplified example. Nothing validates the API's
+            # JSON shape, so each field's type and range is checked here (and the
+            # repeated codes interned) before model_construct skips pydantic
+            # validation; items that don't fit (including a missing price) are
+            # skipped and don't count towards the limit.
+            limit = req.limit or 1
+            market = sys.intern(req.market)
+            currency = sys.intern(req.currency or "USD")
+            for flight_item in flight_json_list:
+                if not isinstance(flight_item, simdjson.Object):
+                    bt.logging.debug(f"Skipping non-object Skyscanner flight item: {type(flight_item).__name__}")
+                    continue
                 try:
-                    r = requests.get(url, headers=headers, params=query_params, timeout=10)
-                    r.raise_for_status()
-                    data = r.json()
-
-                    # Now parse `data` from Skyscanner’s response structure
-                    # to fill a FlightSearchResponse object. The actual JSON shape
-                    # will differ, so adapt to the real structure.
-
-                    # Example pseudo-parse:
-                    flight_json_list = data.get("result", {}).get("flights", [])
-                    if not flight_json_list:
-                        # If no flights found, we might fallback
-                        bt.logging.info("No flights returned by Skyscanner for query, returning empty list.")
-                    else:
-                        # Convert each flight JSON to a FlightSearchResponse
-                        # This is a highly simplified example:
-                        for flight_item in flight_json_list[: req.limit or 1]:  # only up to limit
-                            fsr = FlightSearchResponse(
-                                market=req.market,
-                                category="Cheapest",
-                                price=float(flight_item.get("price", 0.0)),
-                                currency=req.currency or "USD",
-                                departure_time=str(flight_item.get("departure", {}).get("time", "")),
-                                arrival_time=str(flight_item.get("arrival", {}).get("time", "")),
-                                departure_city=req.origin,
-                                arrival_city=req.destination,
-                                stops=flight_item.get("stops", 0),
-                                carrier=str(flight_item.get("carrier", "Skyscanner")),
-                                duration_days=1.0  # or compute from times
-                            )
-                            flights_for_this_query.append(fsr)
-
-                except requests.RequestException as e:
-                    bt.logging.warning(f"Skyscanner request failed: {e}")
-                    # fallback to mock
-                    flights_for_this_query.append(self._mock_flight(req))
-            else:
-                # No valid API key, use a mock flight
-                flights_for_this_query.append(self._mock_flight(req))
-
-            # If no flights, can fallback:
-            if not flights_for_this_query:
-                flights_for_this_query.append(self._mock_flight(req))
-
-            # Collect
-            all_responses.append(flights_for_this_query)
+                    price = float(_typed(_at(flight_item, "/price", None), (int, float), "price"))
+                    stops = _typed(_at(flight_item, "/stops", 0), int, "stops")
+                    if stops < 0:
+                        raise ValueError(f"negative stops: {stops}")
+                    fsr = FlightSearchResponse.model_construct(
+                        market=market,
+                        category="Cheapest",
+                        price=price,
+                        currency=currency,
+                        departure_time=_typed(_at(flight_item, "/departure/time", ""), str, "departure time"),
+                        arrival_time=_typed(_at(flight_item, "/arrival/time", ""), str, "arrival time"),
+                        departure_city=req.origin,
+                        arrival_city=req.destination,
+                        stops=stops,
+                        carrier=sys.intern(_typed(_at(flight_item, "/carrier", "Skyscanner"), str, "carrier")),
+                        duration_days=1.0  # or compute from times
+                    )
+                except ValueError as e:
+                    bt.logging.debug(f"Skipping malformed Skyscanner flight item: {e}")
+                    continue
+                flights_for_this_query.append(fsr)
+                if len(flights_for_this_query) == limit:  # only up to limit
+                    break
 
-        return FlightSearchBatchResponse(responses=all_responses)
+            return flights_for_this_query
+        finally:
+            # pysimdjson refuses to parse again while any Object/Array of this
+            # document is alive. If conversion raises, the traceback keeps this
+            # frame (and these proxies) alive inside asyncio.gather, which would
+            # break every later query of the batch, so drop them explicitly.
+            del data, flight_json_list, flight_item
 
     def _mock_flight(self, req: FlightSearchRequest) -> FlightSearchResponse:
         """
         Example fallback if we fail to call real API or it returns no data.
         """
-        bt.logging.info("Using mock flight data as a fallback.")
+        bt.logging.debug("Using mock flight data as a fallback.")
         return FlightSearchResponse(
             market=req.market,
             category="Cheapest",
@@ -160,15 +300,14 @@ class Miner(BaseMinerNeuron):
             bt.logging.warning("Received a request without a dendrite or hotkey.")
             return True, "Missing dendrite or hotkey"
 
-        uid = self.metagraph.hotkeys.index(synapse.dendrite.hotkey)
+        uid = self._hotkey_to_uid.get(synapse.dendrite.hotkey)
         # Disallow unknown hotkeys if config says so
-        if (not self.config.blacklist.allow_non_registered
-            and synapse.dendrite.hotkey not in self.metagraph.hotkeys):
+        if uid is None and not self.config.blacklist.allow_non_registered:
             return True, "Unrecognized hotkey"
 
         # If forcing validator permit, ensure caller is a validator
         if self.config.blacklist.force_validator_permit:
-            if not self.metagraph.validator_permit[uid]:
+            if uid is None or not self.metagraph.validator_permit[uid]:
                 bt.logging.warning(f"Blacklisting request from non-validator hotkey {synapse.dendrite.hotkey}")
                 return True, "Non-validator hotkey"
 
@@ -181,9 +320,31 @@ class Miner(BaseMinerNeuron):
         if synapse.dendrite is None or synapse.dendrite.hotkey is None:
             bt.logging.warning("Received a request without a dendrite or hotkey.")
             return 0.0
-        caller_uid = self.metagraph.hotkeys.index(synapse.dendrite.hotkey)
+        caller_uid = self._hotkey_to_uid.get(synapse.dendrite.hotkey)
+        if caller_uid is None:
+            return 0.0
         return float(self.metagraph.S[caller_uid])  # stake-based priority
 
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Stops the miner's background operations and closes the shared HTTP client.
+        """
+        super().__exit__(exc_type, exc_value, traceback)
+        if self._client is not None and not self._client.is_closed and self._client_loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), self._client_loop).result(timeout=5)
+
+    def resync_metagraph(self):
+        """Resyncs the metagraph and rebuilds the hotkey -> uid lookup."""
+        super().resync_metagraph()
+        self._refresh_hotkey_index()
+
+    def _refresh_hotkey_index(self):
+        """
+        Rebuild the hotkey -> uid dict so blacklist/priority avoid a linear
+        scan of `metagraph.hotkeys` on every request.
+        """
+        self._hotkey_to_uid = {hk: uid for uid, hk in enumerate(self.metagraph.hotkeys)}
+
 
 if __name__ == "__main__":
     with Miner() as miner:
@@ -1,9 +1,11 @@
+import csv
 import time
-import pandas as pd
+import logging
+import asyncio
 import bittensor as bt
-import random
 import numpy as np
-from typing import List
+from itertools import chain
+from typing import List, Optional, Tuple
 import datetime
 
 from template.base.validator import BaseValidatorNeuron
@@ -14,7 +16,66 @@ from template.protocol import (
     FlightSearchResponse
 )
 from template.utils.uids import get_random_uids
-from template.utils.misc import generate_random_date
+from template.utils.misc import generate_random_dates
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv, compute as pc
+except ImportError:
+    # Fall back to the stdlib csv module; the files are small enough.
+    pa = pacsv = pc = None
+
+
+def _text_convert_options(columns: List[str]) -> "pacsv.ConvertOptions":
+    """
+    Read `columns` the way csv.DictReader does: as raw text with no type
+    inference (so ids stay "9", not 9.0) and only empty cells as nulls
+    (so codes like "NA" are kept). Both backends then yield the same values.
+    """
+    return pacsv.ConvertOptions(
+        column_types={name: pa.string() for name in columns},
+        null_values=[''],
+        strings_can_be_null=True,
+    )
+
+
+def _read_markets(path: str) -> np.ndarray:
+    """
+    Read the non-empty MarketCode column of the markets CSV.
+    """
+    if pacsv is None:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            return np.array([row['MarketCode'] for row in csv.DictReader(f) if row['MarketCode']], dtype=object)
+
+    # Empty cells are the only nulls, so drop_null() matches the filter above.
+    convert_options = _text_convert_options(['MarketCode'])
+    return pacsv.read_csv(path, convert_options=convert_options).column('MarketCode').drop_null().to_numpy()
+
+
+def _read_airports(path: str) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    """
+    Read the skyId, entityId and (if present) airportId columns of the
+    AIRPORT rows of the airports CSV.
+    """
+    if pacsv is None:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            # Filter only airports
+            rows = [row for row in reader if row['entityType'] == 'AIRPORT']
+        column = lambda name: np.array([row[name] for row in rows], dtype=object)
+        has_airport_id = 'airportId' in reader.fieldnames
+    else:
+        convert_options = _text_convert_options(['skyId', 'entityId', 'airportId', 'entityType'])
+        tbl_airports = pacsv.read_csv(path, convert_options=convert_options)
+        # Filter only airports
+        tbl_airports = tbl_airports.filter(pc.equal(tbl_airports['entityType'], 'AIRPORT'))
+        # Empty cells come back as "" like in the csv module, not None
+        column = lambda name: pc.fill_null(tbl_airports[name], '').to_numpy()
+        has_airport_id = 'airportId' in tbl_airports.column_names
+
+    # airportId is only needed for the "API" scenario
+    return column('skyId'), column('entityId'), column('airportId') if has_airport_id else None
+
 
 class Validator(BaseValidatorNeuron):
     """
@@ -37,24 +98,25 @@ class Validator(BaseValidatorNeuron):
         # Load markets list
         markets_file = self.config.get('markets_file', '/root/subnet_test/bittensor-subnet-template/country_code.csv')
         try:
-            df_markets = pd.read_csv(markets_file)
-            self.markets = df_markets['MarketCode'].dropna().tolist()
+            self._markets = _read_markets(markets_file)
         except Exception as e:
             bt.logging.error(f"Failed to load markets: {e}")
-            self.markets = []
+            self._markets = np.empty(0, dtype=object)
 
-        # Load airports list
+        # Load airports list as column arrays (SoA) so batches can be sampled by index
         airports_file = self.config.get('airports_file', '/root/subnet_test/bittensor-subnet-template/airports.csv')
         try:
-            df_airports = pd.read_csv(airports_file)
-            # Filter only airports
-            self.airports = df_airports[df_airports['entityType']=='AIRPORT'].to_dict('records')
+            self._sky_ids, self._entity_ids, self._airport_ids = _read_airports(airports_file)
         except Exception as e:
             bt.logging.error(f"Failed to load airports: {e}")
-            self.airports = []
+            self._sky_ids = np.empty(0, dtype=object)
+            self._entity_ids = np.empty(0, dtype=object)
+            self._airport_ids = None
+
+        self._rng = np.random.default_rng()
 
         # Determine batch size
-        self.batch_size = min(len(self.markets), self.config.get('batch_size', 10))
+        self.batch_size = min(len(self._markets), self.config.get('batch_size', 10))
 
     async def forward(self, synapse: FlightSearchRequest) -> List[FlightSearchResponse]:
         """
@@ -62,20 +124,23 @@ class Validator(BaseValidatorNeuron):
         but actually uses it to generate a batch of queries to send to miners.
         """
         # 1. Generate batch queries for different markets
-        queries: List[FlightSearchRequest] = []
-        for _ in range(self.batch_size):
-            # Pick random market and two distinct airports
-            market = random.choice(self.markets)
-            origin, destination = random.sample(self.airports, 2)
-            random_date = generate_random_date()  # returns a single string date
-
-            # If using a certain "API" scenario, copy some fields from the passed-in synapse
-            if self.API:
-                q = FlightSearchRequest(
-                    date=random_date,
-                    origin=str(origin['airportId']),
+        # Pick random markets and two distinct airports per query, all at once:
+        # adding an offset in [1, n) modulo n guarantees destination != origin.
+        n_airports = len(self._sky_ids)
+        m_idx = self._rng.integers(0, len(self._markets), size=self.batch_size)
+        o_idx = self._rng.integers(0, n_airports, size=self.batch_size)
+        d_idx = (o_idx + self._rng.integers(1, n_airports, size=self.batch_size)) % n_airports
+        markets = self._markets[m_idx].tolist()
+        dates = generate_random_dates(self.batch_size, rng=self._rng)
+
+        # If using a certain "API" scenario, copy some fields from the passed-in synapse
+        if self.API:
+            queries: List[FlightSearchRequest] = [
+                FlightSearchRequest(
+                    date=date,
+                    origin=str(origin),
                     # originId=str(origin['entityId']),
-                    destination=str(destination['airportId']),
+                    destination=str(destination),
                     # destinationId=str(destination['entityId']),
                     cabinClass=synapse.cabinClass,
                     adults=synapse.adults,
@@ -85,20 +150,28 @@ class Validator(BaseValidatorNeuron):
                     currency=synapse.currency,
                     market=market,
                 )
-            else:
-                # Minimal fields, rely on defaults for the rest
-                q = FlightSearchRequest(
-                    date=random_date,
-                    origin=str(origin['skyId']),
-                    destination=str(destination['skyId']),
+                for date, market, origin, destination in zip(
+                    dates, markets, self._airport_ids[o_idx].tolist(), self._airport_ids[d_idx].tolist()
+                )
+            ]
+        else:
+            # Minimal fields, rely on defaults for the rest
+            queries = [
+                FlightSearchRequest(
+                    date=date,
+                    origin=str(origin),
+                    destination=str(destination),
                     market=market,
                 )
-
-            queries.append(q)
+                for date, market, origin, destination in zip(
+                    dates, markets, self._sky_ids[o_idx].tolist(), self._sky_ids[d_idx].tolist()
+                )
+            ]
 
         batch = FlightSearchBatchRequest(queries=queries)
         bt.logging.info(f"Dispatching batch of {len(queries)} requests")
-        bt.logging.info(f"Sample queries: {queries[:2]} ...")
+        if bt.logging.get_level() <= logging.DEBUG:
+            bt.logging.debug(f"Sample queries: {queries[:2]} ...")
 
         # 2. Select miners and send batch
         miner_uids = get_random_uids(self, k=self.batch_size)
@@ -106,46 +179,80 @@ class Validator(BaseValidatorNeuron):
         axons = [self.metagraph.axons[0], self.metagraph.axons[1]] #[self.metagraph.axons[uid] for uid in miner_uids]
         bt.logging.info(f"---------------------Sending batch to miners----------------------: {axons}")
 
-        # We'll receive a list of FlightSearchBatchResponse (one per axon)
-        batch_responses: List[FlightSearchBatchResponse] = await self.dendrite(
-            axons=axons,
-            synapse=batch,
-            deserialize=True
+        # Query each axon as its own task so one slow miner only costs its own
+        # timeout instead of holding up the whole batch.
+        timeout = self.config.neuron.timeout
+        results = await asyncio.gather(
+            *[
+                # dendrite enforces `timeout` itself (408 synapse); wait_for is only a
+                # backstop, so give it a grace period instead of racing that timer.
+                asyncio.wait_for(
+                    self.dendrite(axons=[axon], synapse=batch, deserialize=True, timeout=timeout),
+                    timeout=timeout + 1,
+                )
+                for axon in axons
+            ],
+            return_exceptions=True,
         )
+        # We'll receive a list of FlightSearchBatchResponse (one per responding axon)
+        batch_responses: List[FlightSearchBatchResponse] = []
+        for axon, result in zip(axons, results):
+            if isinstance(result, Exception):
+                bt.logging.warning(f"Query to {axon} failed: {result!r}")
+            elif result:
+                batch_responses.append(result[0])
         bt.logging.info(f"Received {len(batch_responses)} batch responses")
 
         # 3. Collect all individual FlightSearchResponse from each batch
-        all_responses: List[FlightSearchResponse] = []
-        for batch_resp in batch_responses:
-            for resp_list in batch_resp.responses:
-                all_responses.extend(resp_list)
+        all_responses: List[FlightSearchResponse] = list(chain.from_iterable(
+            resp_list
+            for batch_resp in batch_responses if batch_resp is not None
+            for resp_list in batch_resp.responses
+        ))
 
         if not all_responses:
             bt.logging.warning("No flight options returned from miners")
             return []
 
-        # 4. Sort by price and reward
-        all_responses.sort(key=lambda r: r.price)
-        best_price = all_responses[0].price
-        for resp in all_responses:
-            profit = max(0.0, best_price - resp.price)
-            bt.logging.info(f"Rewarding miner {resp.uid} with profit {profit}")
+        # 4. Find the best price and reward
+        prices = np.fromiter((r.price for r in all_responses), dtype=np.float64, count=len(all_responses))
+        best_price = prices.min()
+        profits = np.maximum(0.0, best_price - prices)
+        # Per-response reward logs are DEBUG (in backpropagate); one INFO summary here.
+        for resp, profit in zip(all_responses, profits.tolist()):
             self.backpropagate(resp, profit)
-
-        self.save_state()
+        bt.logging.info(
+            f"Rewarded {len(all_responses)} responses: best_price={best_price:.2f} mean_profit={profits.mean():.4f}"
+        )
 
         # 5. Return top results (based on original request limit)
-        # e.g. if synapse.limit was 3, return first 3 flights
-        return all_responses[:synapse.limit]
+        # e.g. if synapse.limit was 3, return the 3 cheapest flights.
+        # argpartition selects the k cheapest in O(N); only those k get sorted.
+        k = min(synapse.limit, len(prices))
+        if k <= 0:
+            return []
+        top_idx = np.argpartition(prices, k - 1)[:k]
+        top_idx = top_idx[np.argsort(prices[top_idx], kind="stable")]
+        return [all_responses[i] for i in top_idx]
 
     def backpropagate(self, synapse: FlightSearchResponse, profit: float) -> None:
         """
         Optionally do your own reward or scoring logic here.
         For now, calls the parent method that updates self.scores.
         """
-        bt.logging.info(f"Backpropagating profit {profit} for synapse: {synapse}")
+        # Log only uid/profit: formatting the whole synapse per response is costly.
+        if bt.logging.get_level() <= logging.DEBUG:
+            bt.logging.debug(f"Backpropagating profit {profit} for miner {synapse.uid}")
         super().backpropagate(synapse, profit)
 
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Stops the validator's background operations and flushes a final save,
+        since the run loop exits before its next sync() persists the state.
+        """
+        super().__exit__(exc_type, exc_value, traceback)
+        self.save_state()
+
 if __name__ == "__main__":
     # Start the validator in a background thread, blocking while we do a simple loop
     with Validator() as validator:
@@ -1,11 +1,16 @@
+import sys
 import typing
 import bittensor as bt
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, Literal, List
 
 # ----------------------------------------------------------------------
 # PROTOCOL: Validator ↔ Miner for Skyscanner “cheapest flight” queries
 # ----------------------------------------------------------------------
+# Note: pydantic v2 dropped the v1 `Config.json_loads` / `Config.json_dumps`
+# hooks, so orjson cannot be plugged in here. model_dump_json() and
+# model_validate_json() already run in pydantic-core (Rust), so these models
+# keep the default config.
 
 class FlightSearchRequest(bt.Synapse, BaseModel):
     """
@@ -79,6 +84,9 @@ class FlightSearchResponse(bt.Synapse, BaseModel):
     Returned by the miner with details for one flight option.
     If you set limit>1, the validator can collect multiple of these.
     """
+    # Built once per flight and never reassigned, so skip assignment validation.
+    model_config = ConfigDict(validate_assignment=False)
+
     market: str = Field(
         ...,
         description="Market/country code for pricing"
@@ -126,6 +134,15 @@ class FlightSearchResponse(bt.Synapse, BaseModel):
         description="Total trip duration in days"
     )
 
+    @field_validator("market", "currency", "carrier")
+    @classmethod
+    def intern_repeated_codes(cls, v: str) -> str:
+        """
+        These short codes repeat across every flight in a batch; interning
+        them shares one str object per distinct value.
+        """
+        return sys.intern(v)
+
     def deserialize(self) -> None:
         """
         Hook after deserialization; you could parse the timestamps
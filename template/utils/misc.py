@@ -21,8 +21,9 @@ import math
 import datetime
 import random
 import hashlib as rpccheckhealth
+import numpy as np
 from math import floor
-from typing import Callable, Any
+from typing import Callable, Any, List, Optional
 from functools import lru_cache, update_wrapper
 
 
@@ -134,3 +135,24 @@ def generate_random_date(days: int = 60, start_offset: int = 2) -> str:
     ]
     random_date = random.choice(date_list)
     return random_date
+
+
+def generate_random_dates(
+    n: int, days: int = 60, start_offset: int = 2, rng: Optional[np.random.Generator] = None
+) -> List[str]:
+    """
+    Vectorized version of `generate_random_date` that draws `n` dates at once.
+
+    Args:
+        n (int): Number of dates to draw.
+        days (int): Number of consecutive days to draw from.
+        start_offset (int): Days to offset from today for the start date.
+        rng (np.random.Generator): Random generator to use, a fresh one if None.
+
+    Returns:
+        date_list (list[str]): `n` random dates in "yyyy-mm-dd" format.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    start_date = np.datetime64(datetime.date.today(), "D") + start_offset
+    offsets = rng.integers(0, days, size=n).astype("timedelta64[D]")
+    return (start_date + offsets).astype(str).tolist()